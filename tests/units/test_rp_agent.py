@@ -11,14 +11,16 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License
 
+import copy
+import functools
 import sys
 import traceback
+from types import SimpleNamespace
 from unittest import mock
 
 # noinspection PyPackageRequirements
 import pytest
 from behave.model_core import Status
-from delayed_assert import assert_expectations, expect
 from prettytable import MARKDOWN, PrettyTable
 from reportportal_client import RPClient, BatchedRPClient, ThreadedRPClient
 from reportportal_client.logs import MAX_LOG_BATCH_PAYLOAD_SIZE
@@ -27,8 +29,13 @@ from behave_reportportal.behave_agent import BehaveAgent, create_rp_service
 from behave_reportportal.config import Config, LogLayout
 from behave_reportportal.utils import Singleton
 
+_SKIPPED, _FAILED = Status.skipped, Status.failed
 
-@pytest.fixture()
+
+# Module and session scoped fixtures hand out objects that tests only read,
+# so the tests stay order independent and can run under pytest-xdist
+# (pytest -n auto tests/units).
+@pytest.fixture(scope="session")
 def config():
     return Config(
         endpoint="endpoint",
@@ -40,34 +47,73 @@ def config():
     )
 
 
-@pytest.fixture(autouse=True)
-def clean_instances():
+@pytest.fixture()
+def mutable_config(config):
+    return copy.copy(config)
+
+
+@functools.lru_cache(maxsize=None)
+def _make_exc(kind):
+    try:
+        raise kind("error!")
+    except kind as e:
+        e_traceback = sys.exc_info()[2]
+        return e, e_traceback, "".join(
+            traceback.TracebackException(kind, e, e_traceback).format()
+        )
+
+
+_FAIL_EXC, _FAIL_TB, _FAIL_FMT = _make_exc(AssertionError)
+_FAIL_STEP_MSG = "Step [keyword]: name was finished with exception.\n" \
+                 f"{_FAIL_FMT}\nError message"
+
+
+def _rp_client_mock():
+    return mock.NonCallableMock(spec_set=RPClient, launch_uuid=None)
+
+
+@pytest.fixture()
+def clean_singletons():
     yield
-    Singleton._instances = {}
+    Singleton._instances.clear()
 
 
-@pytest.mark.parametrize(
-    "status,expected",
-    [
-        ("passed", "PASSED"),
-        ("skipped", "SKIPPED"),
-        ("failed", "FAILED"),
-        ("xyz", "PASSED"),
-    ],
-)
-def test_convert_to_rp_status(status, expected):
-    actual = BehaveAgent.convert_to_rp_status(status)
-    assert (
-            actual == expected
-    ), f"Incorrect status:\nActual: {actual}\nExpected:{expected}"
+@pytest.fixture()
+def mock_rps(clean_singletons):
+    return _rp_client_mock()
+
+
+@pytest.fixture(scope="module")
+def mock_context():
+    return SimpleNamespace(_stack=())
+
+
+@pytest.fixture(autouse=True, scope="module")
+def fixed_timestamp():
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("behave_reportportal.behave_agent.timestamp", lambda: 123)
+        yield
+
 
+_STATUS_CASES = [
+    ("passed", "PASSED"),
+    ("skipped", "SKIPPED"),
+    ("failed", "FAILED"),
+    ("xyz", "PASSED"),
+]
 
-def test_attributes(config):
+
+def test_convert_to_rp_status():
+    for status, expected in _STATUS_CASES:
+        actual = BehaveAgent.convert_to_rp_status(status)
+        assert actual == expected, f"case={status}"
+
+
+def test_attributes(config, mock_rps):
     mock_item = mock.Mock()
     mock_item.tags = None
-    mock_rps = mock.create_autospec(RPClient)
     ba = BehaveAgent(config, mock_rps)
-    expect(ba._attributes(mock_item) == [], "Attributes is not empty")
+    assert ba._attributes(mock_item) == [], "Attributes is not empty"
     mock_item.tags = ["a", "b", "attribute(k1:v1,v2)"]
     exp = [
         {"value": "a"},
@@ -76,91 +122,72 @@ def test_attributes(config):
         {"value": "v2"},
     ]
     act = ba._attributes(mock_item)
-    expect(
-        act == exp,
-        f"Attributes are incorrect:\nActual: {act}\nExpected: {exp}",
-    )
-    assert_expectations()
-
-
-@pytest.mark.parametrize(
-    "tags,exp_attrs",
-    [
-        (["attribute( k1: v1,  v2,v3 )"], ["k1: v1", "v2", "v3"]),
-        (["attribute(k1:v1,k2:v2)"], ["k1:v1", "k2:v2"]),
-        (["attribute(v1,v2)"], ["v1", "v2"]),
-        (["attribute(v1)"], ["v1"]),
-        (["attribute(v1)", "attribute(k2:v2,v3)"], ["v1", "k2:v2", "v3"]),
-        (["attr(v1)"], []),
-        (["attribute"], []),
-        (["attribute)"], []),
-        (["attribute("], []),
-        (["attribute()"], []),
-        (["attribute(some_text"], []),
-        (["attributesome_text)"], []),
-    ],
-)
-def test_get_attributes_from_tags(tags, exp_attrs):
-    act_attrs = BehaveAgent._get_attributes_from_tags(tags)
-    assert act_attrs == exp_attrs
-
-
-@pytest.mark.parametrize(
-    "tags,exp_test_case_id",
-    [
-        (["test_case_id(123)"], "123"),
-        (["test_case_id(1,2,3)"], "1,2,3"),
-        (["test_case_id()"], None),
-        (["test_case_id(1)", "test_case_id(2)"], "1"),
-        (["some_tag"], None),
-        (["some_tag", "test_case_id(2)"], "2"),
-        (["test_case_id"], None),
-        (["test_case_id("], None),
-        (["test_case_id)"], None),
-    ],
-)
-def test_case_id(tags, exp_test_case_id):
+    assert act == exp
+
+
+_ATTRIBUTES_FROM_TAGS_CASES = [
+    (["attribute( k1: v1,  v2,v3 )"], ["k1: v1", "v2", "v3"]),
+    (["attribute(k1:v1,k2:v2)"], ["k1:v1", "k2:v2"]),
+    (["attribute(v1,v2)"], ["v1", "v2"]),
+    (["attribute(v1)"], ["v1"]),
+    (["attribute(v1)", "attribute(k2:v2,v3)"], ["v1", "k2:v2", "v3"]),
+    (["attr(v1)"], []),
+    (["attribute"], []),
+    (["attribute)"], []),
+    (["attribute("], []),
+    (["attribute()"], []),
+    (["attribute(some_text"], []),
+    (["attributesome_text)"], []),
+]
+
+
+def test_get_attributes_from_tags():
+    for tags, exp_attrs in _ATTRIBUTES_FROM_TAGS_CASES:
+        act_attrs = BehaveAgent._get_attributes_from_tags(tags)
+        assert act_attrs == exp_attrs, f"case={tags}"
+
+
+_TEST_CASE_ID_CASES = [
+    (["test_case_id(123)"], "123"),
+    (["test_case_id(1,2,3)"], "1,2,3"),
+    (["test_case_id()"], None),
+    (["test_case_id(1)", "test_case_id(2)"], "1"),
+    (["some_tag"], None),
+    (["some_tag", "test_case_id(2)"], "2"),
+    (["test_case_id"], None),
+    (["test_case_id("], None),
+    (["test_case_id)"], None),
+]
+
+
+def test_case_id():
     mock_scenario = mock.Mock()
-    mock_scenario.tags = tags
-    act_test_case_id = BehaveAgent._test_case_id(mock_scenario)
-    assert act_test_case_id == exp_test_case_id
+    for tags, exp_test_case_id in _TEST_CASE_ID_CASES:
+        mock_scenario.tags = tags
+        act_test_case_id = BehaveAgent._test_case_id(mock_scenario)
+        assert act_test_case_id == exp_test_case_id, f"case={tags}"
 
 
 def test_code_ref():
     mock_item = mock.Mock()
     mock_item.location = None
-    expect(BehaveAgent._code_ref(mock_item) is None, "code_ref is not None")
+    assert BehaveAgent._code_ref(mock_item) is None, "code_ref is not None"
     mock_location = mock.Mock()
     mock_location.filename = "filename"
     mock_location.line = 24
     mock_item.location = mock_location
-    expect(
-        BehaveAgent._code_ref(mock_item) == "filename:24",
-        f"code_ref is incorrect:\n"
-        f"Actual: {BehaveAgent._code_ref(mock_item)}\n"
-        f"Expected: {'filename:24'}",
-    )
-    assert_expectations()
+    assert BehaveAgent._code_ref(mock_item) == "filename:24"
 
 
 def test_get_parameters():
     mock_item = mock.Mock()
     mock_item._row = None
-    expect(
-        BehaveAgent._get_parameters(mock_item) is None,
-        "parameters is not None",
-    )
+    assert BehaveAgent._get_parameters(mock_item) is None, "parameters is not None"
     mock_row = mock.Mock()
     mock_row.headings = ["A", "B"]
     mock_row.cells = [1, 2]
     mock_item._row = mock_row
-    expect(
-        BehaveAgent._get_parameters(mock_item) == {"A": 1, "B": 2},
-        f"parameters are incorrect:\n"
-        f"Actual: {BehaveAgent._get_parameters(mock_item)}\n"
-        f"Expected: {{'A': 1, 'B': 2}}",
-    )
-    assert_expectations()
+    assert BehaveAgent._get_parameters(mock_item) == {"A": 1, "B": 2}
 
 
 def test_create_rp_service_disabled_rp():
@@ -200,35 +227,31 @@ def test_create_rp_service_init(mock_rps):
     )
 
 
-@pytest.mark.parametrize(
-    'client_type, client_class',
-    [
-        ('SYNC', RPClient),
-        ('ASYNC_BATCHED', BatchedRPClient),
-        ('ASYNC_THREAD', ThreadedRPClient),
-        (None, RPClient),
-        ('CETA', KeyError)
-    ]
-)
-def test_create_rp_service_init_type(client_type, client_class):
-    try:
+_CLIENT_TYPE_CASES = [
+    ('SYNC', RPClient),
+    ('ASYNC_BATCHED', BatchedRPClient),
+    ('ASYNC_THREAD', ThreadedRPClient),
+    (None, RPClient),
+]
+
+
+def test_create_rp_service_init_type():
+    for client_type, client_class in _CLIENT_TYPE_CASES:
         client = create_rp_service(Config(endpoint='A', api_key='B', project='C', client_type=client_type))
-    except client_class as exc:
-        client = exc
-    assert client is not None
-    assert isinstance(client, client_class)
+        assert isinstance(client, client_class), f"case={client_type}"
+    with pytest.raises(KeyError):
+        create_rp_service(Config(endpoint='A', api_key='B', project='C', client_type='CETA'))
 
 
-def test_init_invalid_config():
+def test_init_invalid_config(clean_singletons):
     ba = BehaveAgent(Config())
     assert ba._rp is None, "Incorrect initialization of agent"
 
 
-def test_init_valid_config(config):
-    ba = BehaveAgent(config, mock.Mock())
-    expect(ba._cfg is not None, "Config is None")
-    expect(ba._rp is not None, "Incorrect initialization of agent")
-    assert_expectations()
+def test_init_valid_config(config, mock_rps):
+    ba = BehaveAgent(config, mock_rps)
+    assert ba._cfg is not None, "Config is None"
+    assert ba._rp is not None, "Incorrect initialization of agent"
 
 
 def test_item_description():
@@ -236,17 +259,9 @@ def test_item_description():
     mock_item.description = None
     mock_context = mock.Mock()
     mock_context.active_outline = None
-    expect(
-        BehaveAgent._item_description(mock_context, mock_item) == "",
-        "Description is not \"\"",
-    )
+    assert BehaveAgent._item_description(mock_context, mock_item) == "", "Description is not \"\""
     mock_item.description = ["a", "b"]
-    expect(
-        BehaveAgent._item_description(mock_context, mock_item) == "Description:\na\nb",
-        f"Description is incorrect:\n"
-        f"Actual: {BehaveAgent._item_description(mock_context, mock_item)}\n"
-        f"Expected: Description:\na\nb",
-    )
+    assert BehaveAgent._item_description(mock_context, mock_item) == "Description:\na\nb"
     mock_context.active_outline = mock.Mock()
     mock_context.active_outline.headings = ["number_a", "number_b"]
     mock_context.active_outline.cells = ["1", "2"]
@@ -255,22 +270,11 @@ def test_item_description():
     pt.add_row(mock_context.active_outline.cells)
     pt.set_style(MARKDOWN)
     table = pt.get_string()
-    expect(
-        BehaveAgent._item_description(mock_context, mock_item) == f"Description:\na\nb\n\n{table}",
-        f"Description is incorrect:\n"
-        f"Actual: {BehaveAgent._item_description(mock_context, mock_item)}\n"
-        f"Expected: Description:\na\nb\n\n{table}",
-    )
-
-    assert_expectations()
+    assert BehaveAgent._item_description(mock_context, mock_item) == f"Description:\na\nb\n\n{table}"
 
 
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_start_launch(mock_timestamp, config):
-    mock_timestamp.return_value = 123
-    mock_rps = mock.create_autospec(RPClient)
+def test_start_launch(config, mock_rps, mock_context):
     mock_rps.launch_uuid = None
-    mock_context = mock.Mock()
     ba = BehaveAgent(config, mock_rps)
     ba.start_launch(mock_context, some_key="some_value")
     mock_rps.start_launch.assert_called_once_with(
@@ -284,12 +288,8 @@ def test_start_launch(mock_timestamp, config):
     )
 
 
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_start_launch_with_rerun(mock_timestamp):
-    mock_timestamp.return_value = 123
-    mock_rps = mock.create_autospec(RPClient)
+def test_start_launch_with_rerun(mock_rps, mock_context):
     mock_rps.launch_uuid = None
-    mock_context = mock.Mock()
     cfg = Config(
         endpoint="endpoint",
         token="token",
@@ -312,13 +312,10 @@ def test_start_launch_with_rerun(mock_timestamp):
     )
 
 
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_start_launch_attributes(mock_timestamp, config):
-    config.launch_attributes = ['one', 'two', 'key:value']
-    mock_timestamp.return_value = 123
-    mock_rps = mock.create_autospec(RPClient)
+def test_start_launch_attributes(mutable_config, mock_rps):
+    mutable_config.launch_attributes = ['one', 'two', 'key:value']
     mock_rps.launch_uuid = None
-    ba = BehaveAgent(config, mock_rps)
+    ba = BehaveAgent(mutable_config, mock_rps)
     ba.start_launch(mock.Mock())
     call_args_list = mock_rps.start_launch.call_args_list
     assert len(call_args_list) == 1
@@ -338,11 +335,7 @@ def test_start_launch_attributes(mock_timestamp, config):
     )
 
 
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_finish_launch(mock_timestamp, config):
-    mock_timestamp.return_value = 123
-    mock_rps = mock.create_autospec(RPClient)
-    mock_context = mock.Mock()
+def test_finish_launch(config, mock_rps, mock_context):
     ba = BehaveAgent(config, mock_rps)
     ba.finish_launch(mock_context, some_key="some_value")
     mock_rps.finish_launch.assert_called_once_with(
@@ -351,12 +344,8 @@ def test_finish_launch(mock_timestamp, config):
     mock_rps.close.assert_called_once()
 
 
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_skip_finish_launch(mock_timestamp, config):
-    mock_timestamp.return_value = 123
-    mock_rps = mock.create_autospec(RPClient)
-    mock_rps.launch_id = "abc"
-    mock_context = mock.Mock()
+def test_skip_finish_launch(config, mock_rps, mock_context):
+    mock_rps.launch_uuid = "abc"
     ba = BehaveAgent(config, mock_rps)
     ba.start_launch(mock_context, some_key="some_value")
     ba.finish_launch(mock_context)
@@ -364,34 +353,28 @@ def test_skip_finish_launch(mock_timestamp, config):
     mock_rps.finish_launch.assert_not_called()
 
 
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_start_skipped_feature(mock_timestamp, config):
+def test_start_skipped_feature(config, mock_rps):
     mock_feature = mock.Mock()
     mock_feature.tags = ["some_tag", "skip"]
-    mock_timestamp.return_value = 123
-    verify_start_feature(mock_feature, config)
+    verify_start_feature(mock_feature, config, mock_rps)
     mock_feature.skip.assert_called_once_with("Marked with @skip")
 
 
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_start_feature(mock_timestamp, config):
+def test_start_feature(config, mock_rps):
     mock_feature = mock.Mock()
     mock_feature.tags = None
-    mock_timestamp.return_value = 123
-    verify_start_feature(mock_feature, config)
+    verify_start_feature(mock_feature, config, mock_rps)
 
 
-def verify_start_feature(mock_feature, config):
-    mock_rps = mock.create_autospec(RPClient)
+def verify_start_feature(mock_feature, config, mock_rps):
     mock_rps.start_test_item.return_value = "feature_id"
     mock_context = mock.Mock()
     mock_context.active_outline = None
     mock_feature.name = "feature_name"
     mock_feature.description = ["A", "B"]
     ba = BehaveAgent(config, mock_rps)
-    ba.start_feature(mock_context, mock_feature, some_key="some_value")
     # noinspection PyProtectedMember
-    mock_rps.start_test_item.assert_called_once_with(
+    expected = dict(
         name="feature_name",
         start_time=123,
         item_type="SUITE",
@@ -400,6 +383,8 @@ def verify_start_feature(mock_feature, config):
         attributes=ba._attributes(mock_feature),
         some_key="some_value",
     )
+    ba.start_feature(mock_context, mock_feature, some_key="some_value")
+    mock_rps.start_test_item.assert_called_once_with(**expected)
 
     # noinspection PyProtectedMember
     assert ba._feature_id == "feature_id", (
@@ -409,17 +394,14 @@ def verify_start_feature(mock_feature, config):
 
 
 @pytest.mark.parametrize(
-    "tags,expected_status", [(None, "PASSED"), (["skip"], "SKIPPED")]
+    "tags,expected_status",
+    [(None, "PASSED"), (["skip"], "SKIPPED")],
+    ids=["passed", "skip_tag"],
 )
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_finish_feature(mock_timestamp, config, tags, expected_status):
+def test_finish_feature(config, tags, expected_status, mock_rps, mock_context):
     mock_feature = mock.Mock()
     mock_feature.tags = tags
     mock_feature.status.name = "passed"
-    mock_timestamp.return_value = 123
-    mock_rps = mock.create_autospec(RPClient)
-    mock_context = mock.Mock()
-    mock_context._stack = []
     ba = BehaveAgent(config, mock_rps)
     ba._feature_id = "feature_id"
     ba.finish_feature(mock_context, mock_feature, some_key="some_value")
@@ -431,25 +413,20 @@ def test_finish_feature(mock_timestamp, config, tags, expected_status):
     )
 
 
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_start_skipped_scenario(mock_timestamp, config):
+def test_start_skipped_scenario(config, mock_rps):
     mock_scenario = mock.Mock()
     mock_scenario.tags = ["some_tag", "skip"]
-    mock_timestamp.return_value = 123
-    verify_start_scenario(mock_scenario, config)
+    verify_start_scenario(mock_scenario, config, mock_rps)
     mock_scenario.skip.assert_called_once_with("Marked with @skip")
 
 
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_start_scenario(mock_timestamp, config):
+def test_start_scenario(config, mock_rps):
     mock_scenario = mock.Mock()
     mock_scenario.tags = None
-    mock_timestamp.return_value = 123
-    verify_start_scenario(mock_scenario, config)
+    verify_start_scenario(mock_scenario, config, mock_rps)
 
 
-def verify_start_scenario(mock_scenario, config):
-    mock_rps = mock.create_autospec(RPClient)
+def verify_start_scenario(mock_scenario, config, mock_rps):
     mock_rps.start_test_item.return_value = "scenario_id"
     mock_context = mock.Mock()
     mock_context.active_outline = None
@@ -458,9 +435,8 @@ def verify_start_scenario(mock_scenario, config):
     mock_scenario.description = ["A", "B"]
     ba = BehaveAgent(config, mock_rps)
     ba._feature_id = "feature_id"
-    ba.start_scenario(mock_context, mock_scenario, some_key="some_value")
     # noinspection PyProtectedMember
-    mock_rps.start_test_item.assert_called_once_with(
+    expected = dict(
         name="scenario_name",
         start_time=123,
         item_type="STEP",
@@ -472,6 +448,8 @@ def verify_start_scenario(mock_scenario, config):
         test_case_id=ba._test_case_id(mock_scenario),
         some_key="some_value",
     )
+    ba.start_scenario(mock_context, mock_scenario, some_key="some_value")
+    mock_rps.start_test_item.assert_called_once_with(**expected)
     # noinspection PyProtectedMember
     assert ba._scenario_id == "scenario_id", (
         f"Invalid scenario_id:\nActual: {ba._scenario_id}\n"
@@ -480,17 +458,14 @@ def verify_start_scenario(mock_scenario, config):
 
 
 @pytest.mark.parametrize(
-    "tags,expected_status", [(None, "PASSED"), (["skip"], "SKIPPED")]
+    "tags,expected_status",
+    [(None, "PASSED"), (["skip"], "SKIPPED")],
+    ids=["passed", "skip_tag"],
 )
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_finish_scenario(mock_timestamp, config, tags, expected_status):
+def test_finish_scenario(config, tags, expected_status, mock_rps, mock_context):
     mock_scenario = mock.Mock()
     mock_scenario.tags = tags
     mock_scenario.status.name = "passed"
-    mock_timestamp.return_value = 123
-    mock_rps = mock.create_autospec(RPClient)
-    mock_context = mock.Mock()
-    mock_context._stack = []
     ba = BehaveAgent(config, mock_rps)
     ba._scenario_id = "scenario_id"
     ba.finish_scenario(mock_context, mock_scenario, some_key="some_value")
@@ -503,13 +478,10 @@ def test_finish_scenario(mock_timestamp, config, tags, expected_status):
 
 
 @mock.patch.object(BehaveAgent, "_log_scenario_exception")
-def test_finish_failed_scenario_scenario_based(mock_log, config):
+def test_finish_failed_scenario_scenario_based(mock_log, config, mock_rps, mock_context):
     mock_scenario = mock.Mock()
     mock_scenario.tags = []
     mock_scenario.status.name = "failed"
-    mock_rps = mock.create_autospec(RPClient)
-    mock_context = mock.Mock()
-    mock_context._stack = []
     ba = BehaveAgent(config, mock_rps)
     ba.finish_scenario(mock_context, mock_scenario)
     mock_log.assert_called_once_with(mock_scenario)
@@ -519,112 +491,84 @@ def test_finish_failed_scenario_scenario_based(mock_log, config):
 @mock.patch.object(BehaveAgent, "start_step")
 @mock.patch.object(BehaveAgent, "_log_scenario_exception")
 def test_finish_failed_scenario_step_based(
-        mock_log, mock_start_step, mock_finish_step, config
+        mock_log, mock_start_step, mock_finish_step, mutable_config, mock_rps, mock_context
 ):
-    config.log_layout = LogLayout.STEP
+    mutable_config.log_layout = LogLayout.STEP
     mock_scenario = mock.Mock()
     mock_scenario.tags = []
     mock_scenario.status.name = "failed"
     mock_skipped_step = mock.Mock()
-    mock_skipped_step.status = Status.skipped
+    mock_skipped_step.status = _SKIPPED
     mock_skipped_step.keyword = "Then"
     mock_skipped_step.name = "step name"
     mock_skipped_step.text = "step text"
     mock_skipped_step.table = None
     mock_failed_step = mock.Mock()
-    mock_failed_step.status = Status.failed
+    mock_failed_step.status = _FAILED
     mock_scenario.steps = [mock_failed_step, mock_skipped_step]
-    mock_rps = mock.create_autospec(RPClient)
-    mock_context = mock.Mock()
-    mock_context._stack = []
-    ba = BehaveAgent(config, mock_rps)
+    ba = BehaveAgent(mutable_config, mock_rps)
     ba.finish_scenario(mock_context, mock_scenario)
     mock_log.assert_called_once_with(mock_scenario)
     mock_start_step.assert_called_once_with(mock_context, mock_skipped_step)
     mock_finish_step.assert_called_once_with(mock_context, mock_skipped_step)
 
 
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_start_step_step_based(mock_timestamp, config):
-    config.log_layout = LogLayout.STEP
-    mock_step = mock.Mock()
-    mock_step.keyword = "keyword"
-    mock_step.name = "name"
-    mock_step.text = None
-    mock_step.table = None
-    mock_timestamp.return_value = 123
-    mock_rps = mock.create_autospec(RPClient)
-    mock_rps.start_test_item.return_value = "step_id"
-    mock_context = mock.Mock()
-    ba = BehaveAgent(config, mock_rps)
-    ba._scenario_id = "scenario_id"
-    ba.start_step(mock_context, mock_step, some_key="some_value")
-    mock_rps.start_test_item.assert_called_once_with(
-        name="[keyword]: name",
-        start_time=123,
-        item_type="STEP",
-        parent_item_id="scenario_id",
-        has_stats=True,
-        description="",
-        code_ref=BehaveAgent._code_ref(mock_step),
-        some_key="some_value",
-    )
-    ba._step_id = "step_id"
-
-
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_start_step_nested_based(mock_timestamp, config):
-    config.log_layout = LogLayout.NESTED
-    mock_step = mock.Mock()
-    mock_step.keyword = "keyword"
-    mock_step.name = "name"
-    mock_step.text = "step text"
-    mock_step.table = None
-    mock_timestamp.return_value = 123
-    mock_rps = mock.create_autospec(RPClient)
-    mock_rps.start_test_item.return_value = "step_id"
-    mock_context = mock.Mock()
-    ba = BehaveAgent(config, mock_rps)
-    ba._scenario_id = "scenario_id"
-    ba.start_step(mock_context, mock_step, some_key="some_value")
-    mock_rps.start_test_item.assert_called_once_with(
-        name="[keyword]: name",
-        start_time=123,
-        item_type="STEP",
-        parent_item_id="scenario_id",
-        code_ref=BehaveAgent._code_ref(mock_step),
-        description="```\nstep text\n```\n",
-        has_stats=False,
-        some_key="some_value",
-    )
-    mock_rps.log.assert_called_once_with(
-        time=123,
-        message="```\nstep text\n```\n",
-        level="INFO",
-        attachment=None,
-        item_id="step_id",
-    )
+_START_STEP_CASES = [
+    (
+        LogLayout.STEP,
+        None,
+        {"description": "", "has_stats": True},
+        [],
+    ),
+    (
+        LogLayout.NESTED,
+        "step text",
+        {"description": "```\nstep text\n```\n", "has_stats": False},
+        [
+            mock.call(
+                time=123,
+                message="```\nstep text\n```\n",
+                level="INFO",
+                attachment=None,
+                item_id="step_id",
+            )
+        ],
+    ),
+    (LogLayout.SCENARIO, None, None, []),
+]
 
 
-def test_start_step_scenario_based(config):
-    config.log_layout = LogLayout.SCENARIO
-    mock_step = mock.Mock()
-    mock_rps = mock.create_autospec(RPClient)
-    mock_context = mock.Mock()
-    ba = BehaveAgent(config, mock_rps)
-    ba.start_step(mock_context, mock_step, some_key="some_value")
-    mock_rps.start_test_item.assert_not_called()
+def test_start_step(mutable_config, mock_context, clean_singletons):
+    for log_layout, text, expected_item, expected_logs in _START_STEP_CASES:
+        Singleton._instances.clear()
+        mutable_config.log_layout = log_layout
+        mock_step = mock.Mock(keyword="keyword", text=text, table=None)
+        mock_step.name = "name"
+        mock_rps = _rp_client_mock()
+        mock_rps.start_test_item.return_value = "step_id"
+        ba = BehaveAgent(mutable_config, mock_rps)
+        ba._scenario_id = "scenario_id"
+        ba.start_step(mock_context, mock_step, some_key="some_value")
+        if expected_item is None:
+            assert not mock_rps.start_test_item.called, f"case={log_layout}"
+        else:
+            mock_rps.start_test_item.assert_called_once_with(
+                name="[keyword]: name",
+                start_time=123,
+                item_type="STEP",
+                parent_item_id="scenario_id",
+                code_ref=BehaveAgent._code_ref(mock_step),
+                some_key="some_value",
+                **expected_item,
+            )
+        assert mock_rps.log.mock_calls == expected_logs, f"case={log_layout}"
 
 
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_finish_passed_step_step_based(mock_timestamp, config):
-    config.log_layout = LogLayout.STEP
+def test_finish_passed_step_step_based(mutable_config, mock_rps, mock_context):
+    mutable_config.log_layout = LogLayout.STEP
     mock_step = mock.Mock()
     mock_step.status.name = "passed"
-    mock_timestamp.return_value = 123
-    mock_rps = mock.create_autospec(RPClient)
-    mock_context = mock.Mock()
-    ba = BehaveAgent(config, mock_rps)
+    ba = BehaveAgent(mutable_config, mock_rps)
     ba._step_id = "step_id"
     ba.finish_step(mock_context, mock_step, some_key="some_value")
     mock_rps.finish_test_item.assert_called_once_with(
@@ -632,103 +576,75 @@ def test_finish_passed_step_step_based(mock_timestamp, config):
     )
 
 
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_finish_failed_step_step_based(mock_timestamp, config):
-    try:
-        raise AssertionError("error!")
-    except AssertionError as e:
-        e_traceback = sys.exc_info()[2]
-        config.log_layout = LogLayout.STEP
-        mock_step = mock.Mock()
-        mock_step.keyword = "keyword"
-        mock_step.name = "name"
-        mock_step.status.name = "failed"
-        mock_step.exception = e
-        mock_step.exc_traceback = e_traceback
-        mock_step.error_message = "Error message"
-        mock_timestamp.return_value = 123
-        mock_rps = mock.create_autospec(RPClient)
-        mock_context = mock.Mock()
-        ba = BehaveAgent(config, mock_rps)
-        ba._step_id = "step_id"
-        ba._scenario_id = "step_id"
-        ba.finish_step(mock_context, mock_step, some_key="some_value")
-        mock_rps.finish_test_item.assert_called_once_with(
+def test_finish_failed_step_step_based(mutable_config, mock_rps, mock_context):
+    mutable_config.log_layout = LogLayout.STEP
+    mock_step = mock.Mock(
+        keyword="keyword",
+        exception=_FAIL_EXC,
+        exc_traceback=_FAIL_TB,
+        error_message="Error message",
+    )
+    mock_step.name = "name"
+    mock_step.status.name = "failed"
+    ba = BehaveAgent(mutable_config, mock_rps)
+    ba._step_id = "step_id"
+    ba._scenario_id = "step_id"
+    ba.finish_step(mock_context, mock_step, some_key="some_value")
+    mock_rps.finish_test_item.assert_called_once_with(
+        item_id="step_id",
+        end_time=123,
+        status="FAILED",
+        some_key="some_value",
+    )
+    expected_calls = [
+        mock.call(
             item_id="step_id",
-            end_time=123,
-            status="FAILED",
-            some_key="some_value",
-        )
-        formatted_exception = "".join(
-            traceback.format_exception(type(e), e, e_traceback)
+            time=123,
+            level="ERROR",
+            message=_FAIL_STEP_MSG
         )
-        expected_msg = "Step [keyword]: name was finished with exception.\n" \
-                       f"{formatted_exception}\nError message"
-        expected_calls = [
-            mock.call(
-                item_id="step_id",
-                time=123,
-                level="ERROR",
-                message=expected_msg
-            )
-        ]
-        mock_rps.log.assert_has_calls(expected_calls)
+    ]
+    mock_rps.log.assert_has_calls(expected_calls)
 
 
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_finish_failed_step_scenario_based(mock_timestamp, config):
-    try:
-        raise AssertionError("error!")
-    except AssertionError as e:
-        e_traceback = sys.exc_info()[2]
-        config.log_layout = LogLayout.SCENARIO
-        mock_step = mock.Mock()
-        mock_step.keyword = "keyword"
-        mock_step.name = "name"
-        mock_step.status.name = "failed"
-        mock_step.text = None
-        mock_step.table = None
-        mock_step.exception = e
-        mock_step.exception.args = ["Exception message"]
-        mock_step.exc_traceback = e_traceback
-        mock_step.error_message = "Error message"
-        mock_timestamp.return_value = 123
-        mock_rps = mock.create_autospec(RPClient)
-        mock_context = mock.Mock()
-        ba = BehaveAgent(config, mock_rps)
-        ba._scenario_id = "scenario_id"
-        ba.finish_step(mock_context, mock_step)
-        formatted_exception = "".join(
-            traceback.format_exception(type(e), e, e_traceback)
-        )
-        expected_msg = "Step [keyword]: name was finished with exception.\n" \
-                       f"{formatted_exception}\nError message"
-        calls = [
-            mock.call(
-                item_id="scenario_id",
-                time=123,
-                level="ERROR",
-                message=expected_msg,
-            ),
-            mock.call(
-                item_id="scenario_id",
-                time=123,
-                level="INFO",
-                message="[keyword]: name.",
-            ),
-        ]
-        mock_rps.log.assert_has_calls(calls, any_order=True)
+def test_finish_failed_step_scenario_based(mutable_config, mock_rps, mock_context):
+    mutable_config.log_layout = LogLayout.SCENARIO
+    mock_step = mock.Mock(
+        keyword="keyword",
+        text=None,
+        table=None,
+        exception=_FAIL_EXC,
+        exc_traceback=_FAIL_TB,
+        error_message="Error message",
+    )
+    mock_step.name = "name"
+    mock_step.status.name = "failed"
+    ba = BehaveAgent(mutable_config, mock_rps)
+    ba._scenario_id = "scenario_id"
+    ba.finish_step(mock_context, mock_step)
+    calls = [
+        mock.call(
+            item_id="scenario_id",
+            time=123,
+            level="ERROR",
+            message=_FAIL_STEP_MSG,
+        ),
+        mock.call(
+            item_id="scenario_id",
+            time=123,
+            level="INFO",
+            message="[keyword]: name.",
+        ),
+    ]
+    assert sorted(mock_rps.log.call_args_list, key=repr) == sorted(calls, key=repr)
 
 
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_log_exception_without_message(mock_timestamp, config):
-    mock_timestamp.return_value = 123
+def test_log_exception_without_message(config, mock_rps):
     mock_step = mock.Mock()
     mock_step.exception = None
     mock_step.error_message = None
     mock_step.keyword = "keyword"
     mock_step.name = "name"
-    mock_rps = mock.create_autospec(RPClient)
     ba = BehaveAgent(config, mock_rps)
     ba._log_step_exception(mock_step, "step_id")
     mock_rps.log.assert_called_once_with(
@@ -739,15 +655,14 @@ def test_log_exception_without_message(mock_timestamp, config):
     )
 
 
-def test_rp_is_none():
+def test_rp_is_none(clean_singletons):
     ba = BehaveAgent(Config(), None)
     ba.start_step(mock.Mock(), mock.Mock())
     assert ba._step_id is None
 
 
 @mock.patch.object(BehaveAgent, "_log")
-def test_post_log(mock_log, config):
-    mock_rps = mock.create_autospec(RPClient)
+def test_post_log(mock_log, config, mock_rps):
     ba = BehaveAgent(config, mock_rps)
     ba._log_item_id = "log_item_id"
     ba.post_log("message", file_to_attach="filepath")
@@ -757,8 +672,7 @@ def test_post_log(mock_log, config):
 
 
 @mock.patch.object(BehaveAgent, "_log")
-def test_post_launch_log(mock_log, config):
-    mock_rps = mock.create_autospec(RPClient)
+def test_post_launch_log(mock_log, config, mock_rps):
     ba = BehaveAgent(config, mock_rps)
     ba._log_item_id = "log_item_id"
     ba.post_launch_log("message", file_to_attach="filepath")
@@ -768,13 +682,14 @@ def test_post_launch_log(mock_log, config):
 
 
 @mock.patch("behave_reportportal.behave_agent.mimetypes")
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_post__log(mock_timestamp, mock_mime, config):
-    mock_timestamp.return_value = 123
-    mock_rps = mock.create_autospec(RPClient)
+def test_post__log(mock_mime, config, mock_rps):
     ba = BehaveAgent(config, mock_rps)
     mock_mime.guess_type.return_value = ("mime_type", None)
-    with mock.patch("builtins.open", mock.mock_open(read_data="data")):
+    with mock.patch(
+            "behave_reportportal.behave_agent.open",
+            mock.mock_open(read_data="data"),
+            create=True,
+    ):
         ba._log(
             "message", "ERROR", file_to_attach="filepath", item_id="item_id"
         )
@@ -791,41 +706,40 @@ def test_post__log(mock_timestamp, mock_mime, config):
         )
 
 
-@mock.patch.object(PrettyTable, "__init__")
-@mock.patch.object(PrettyTable, "add_row")
-@mock.patch.object(PrettyTable, "get_string")
-def test_build_table_content(mock_get_string, mock_add_row, mock_init):
-    mock_init.return_value = None
-    mock_step, mock_table, mock_rows = mock.Mock(), mock.Mock(), mock.Mock()
-    mock_table.headings = ["A", "B"]
-    mock_rows.cells = ["c", "d"]
-    mock_table.rows = [mock_rows]
-    mock_step.table = mock_table
-    mock_step.text = None
+@pytest.fixture()
+def patched_prettytable():
+    with mock.patch.object(PrettyTable, "__init__", return_value=None) as mock_init, \
+            mock.patch.object(PrettyTable, "add_row") as mock_add_row, \
+            mock.patch.object(PrettyTable, "get_string") as mock_get_string:
+        yield mock_init, mock_add_row, mock_get_string
+
+
+def test_build_table_content(patched_prettytable):
+    mock_init, mock_add_row, mock_get_string = patched_prettytable
+    mock_rows = mock.Mock(cells=["c", "d"])
+    mock_table = mock.Mock(headings=["A", "B"], rows=[mock_rows])
+    mock_step = mock.Mock(table=mock_table, text=None)
     BehaveAgent._build_step_content(mock_step)
     mock_init.assert_called_once_with(field_names=["A", "B"])
     mock_add_row.assert_called_once_with(["c", "d"])
     mock_get_string.assert_called_once()
 
 
-@mock.patch.object(PrettyTable, "__init__")
-def test_build_text_content(mock_init):
+def test_build_text_content(patched_prettytable):
+    mock_init = patched_prettytable[0]
     mock_step = mock.Mock()
     mock_step.table = None
     mock_step.text = "Step text"
     text = BehaveAgent._build_step_content(mock_step)
-    mock_init.assert_not_called()
+    assert mock_init.call_count == 0
     assert text == "```\nStep text\n```\n"
 
 
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_log_scenario_exception_default_message(mock_timestamp, config):
-    mock_timestamp.return_value = 123
+def test_log_scenario_exception_default_message(config, mock_rps):
     mock_scenario = mock.Mock()
     mock_scenario.exception = None
     mock_scenario.error_message = None
     mock_scenario.name = "scenario_name"
-    mock_rps = mock.create_autospec(RPClient)
     ba = BehaveAgent(config, mock_rps)
     ba._scenario_id = "scenario_id"
     ba._log_scenario_exception(mock_scenario)
@@ -837,133 +751,102 @@ def test_log_scenario_exception_default_message(mock_timestamp, config):
     )
 
 
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_log_scenario_exception(mock_timestamp, config):
-    try:
-        raise ValueError("error!")
-    except ValueError as e:
-        e_traceback = sys.exc_info()[2]
-        mock_timestamp.return_value = 123
-        mock_scenario = mock.Mock()
-        mock_scenario.exception = e
-        mock_scenario.exc_traceback = e_traceback
-        mock_scenario.error_message = "Error message"
-        mock_scenario.name = "scenario_name"
-        mock_rps = mock.create_autospec(RPClient)
-        ba = BehaveAgent(config, mock_rps)
-        ba._scenario_id = "scenario_id"
-        ba._log_scenario_exception(mock_scenario)
-        formatted_exception = "".join(
-            traceback.format_exception(type(e), e, e_traceback)
-        )
-        expected_msg = "Scenario 'scenario_name' finished with error.\n" \
-                       f"{formatted_exception}\nError message"
-        mock_rps.log.assert_called_once_with(
-            item_id="scenario_id",
-            time=123,
-            level="ERROR",
-            message=expected_msg,
-        )
+def test_log_scenario_exception(config, mock_rps):
+    e, e_traceback, formatted_exception = _make_exc(ValueError)
+    mock_scenario = mock.Mock()
+    mock_scenario.exception = e
+    mock_scenario.exc_traceback = e_traceback
+    mock_scenario.error_message = "Error message"
+    mock_scenario.name = "scenario_name"
+    ba = BehaveAgent(config, mock_rps)
+    ba._scenario_id = "scenario_id"
+    ba._log_scenario_exception(mock_scenario)
+    expected_msg = "Scenario 'scenario_name' finished with error.\n" \
+                   f"{formatted_exception}\nError message"
+    mock_rps.log.assert_called_once_with(
+        item_id="scenario_id",
+        time=123,
+        level="ERROR",
+        message=expected_msg,
+    )
 
 
-@pytest.mark.parametrize("tags", [None, ["A", "B"]])
-def test_log_fixtures_without_fixture_tags(tags, config):
-    mock_rps = mock.create_autospec(RPClient)
-    mock_item = mock.Mock()
-    mock_item.tags = tags
-    BehaveAgent(config, mock_rps)._log_fixtures(mock_item, "type", "item_id")
-    mock_rps.log.assert_not_called()
-    mock_rps.start_test_item.assert_not_called()
+def test_log_fixtures_without_fixture_tags(config, mock_rps):
+    ba = BehaveAgent(config, mock_rps)
+    for tags in (None, ["A", "B"]):
+        ba._log_fixtures(mock.Mock(tags=tags), "type", "item_id")
+        assert not mock_rps.log.called, f"case={tags}"
+        assert not mock_rps.start_test_item.called, f"case={tags}"
 
 
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_log_fixtures(mock_timestamp):
-    mock_timestamp.return_value = 123
+def test_log_fixtures(mock_rps):
     cfg = Config(
         endpoint="endpoint",
         token="token",
         project="project",
         log_layout=LogLayout.SCENARIO,
     )
-    mock_rps = mock.create_autospec(RPClient)
-    mock_item = mock.Mock()
-    mock_item.tags = ["fixture.A", "fixture.B"]
+    mock_item = mock.Mock(tags=["fixture.A", "fixture.B"])
     BehaveAgent(cfg, mock_rps)._log_fixtures(mock_item, "type", "item_id")
-    mock_rps.log.assert_has_calls(
-        [
-            mock.call(
-                123,
-                f"Using of '{t}' fixture",
-                level="INFO",
-                item_id="item_id",
-            )
-            for t in ("A", "B")
-        ],
-        any_order=True,
-    )
+    calls = [
+        mock.call(
+            123,
+            f"Using of '{t}' fixture",
+            level="INFO",
+            item_id="item_id",
+        )
+        for t in ("A", "B")
+    ]
+    assert mock_rps.log.mock_calls == calls
     cfg.log_layout = LogLayout.STEP
     BehaveAgent(cfg, mock_rps)._log_fixtures(mock_item, "type", "item_id")
-    mock_rps.start_test_item.assert_has_calls(
-        [
-            mock.call(
-                start_time=123,
-                name=f"Using of '{t}' fixture",
-                item_type="type",
-                parent_item_id="item_id",
-                has_stats=True,
-            )
-            for t in ("A", "B")
-        ],
-        any_order=True,
-    )
+    calls = [
+        mock.call(
+            start_time=123,
+            name=f"Using of '{t}' fixture",
+            item_type="type",
+            parent_item_id="item_id",
+            has_stats=True,
+        )
+        for t in ("A", "B")
+    ]
+    assert mock_rps.start_test_item.mock_calls == calls
     assert mock_rps.finish_test_item.call_count == 2
 
 
-def test_log_cleanup_no_layer(config):
-    mock_rps = mock.create_autospec(RPClient)
-    mock_context, mock_func = mock.Mock(), mock.Mock()
-    mock_func.__name__ = "cleanup_func"
-    mock_context._stack = [{"@layer": "scenario", "@cleanups": [mock_func]}]
-    BehaveAgent(config, mock_rps)._log_cleanups(mock_context, "feature")
-    mock_rps.start_test_item.assert_not_called()
-    mock_context._stack = [{"@layer": "feature"}]
-    BehaveAgent(config, mock_rps)._log_cleanups(mock_context, "scenario")
-    mock_rps.start_test_item.assert_not_called()
+@pytest.fixture()
+def make_agent(mock_rps):
+    def _factory(cfg):
+        ba = BehaveAgent(cfg, mock_rps)
+        ba._feature_id = "feature_id"
+        ba._scenario_id = "scenario_id"
+        return ba
 
+    return _factory
 
-def test_log_cleanup_no_cleanups(config):
-    mock_rps = mock.create_autospec(RPClient)
-    mock_context = mock.Mock()
+
+def test_log_cleanup_no_layer(config, mock_rps, make_agent):
+    mock_func = SimpleNamespace(__name__="cleanup_func")
+    mock_context = SimpleNamespace(
+        _stack=[{"@layer": "scenario", "@cleanups": [mock_func]}]
+    )
+    ba = make_agent(config)
+    ba._log_cleanups(mock_context, "feature")
+    assert mock_rps.start_test_item.call_count == 0
     mock_context._stack = [{"@layer": "feature"}]
-    BehaveAgent(config, mock_rps)._log_cleanups(mock_context, "feature")
-    mock_rps.start_test_item.assert_not_called()
+    ba._log_cleanups(mock_context, "scenario")
+    assert mock_rps.start_test_item.call_count == 0
 
 
-@pytest.mark.parametrize(
-    "scope,item_type,item_id",
-    [
-        ("feature", "AFTER_SUITE", "feature_id"),
-        ("scenario", "AFTER_TEST", "scenario_id"),
-    ],
-)
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_log_cleanup_step_based(mock_timestamp, scope, item_type, item_id):
-    cfg = Config(
-        endpoint="E", token="T", project="P", log_layout=LogLayout.STEP
-    )
-    mock_timestamp.return_value = 123
-    mock_rps = mock.create_autospec(RPClient)
-    mock_context, mock_func1, mock_func2 = mock.Mock(), mock.Mock, mock.Mock()
-    mock_func1.__name__ = "cleanup_func1"
-    mock_func2.__name__ = "cleanup_func2"
-    mock_context._stack = [
-        {"@layer": scope, "@cleanups": [mock_func1, mock_func2]}
-    ]
-    ba = BehaveAgent(cfg, mock_rps)
-    ba._feature_id = "feature_id"
-    ba._scenario_id = "scenario_id"
-    ba._log_cleanups(mock_context, scope)
-    calls = [
+def test_log_cleanup_no_cleanups(config, mock_rps, make_agent):
+    mock_context = SimpleNamespace(_stack=[{"@layer": "feature"}])
+    make_agent(config)._log_cleanups(mock_context, "feature")
+    assert mock_rps.start_test_item.call_count == 0
+
+
+_CLEANUP_FUNC_NAMES = ("cleanup_func1", "cleanup_func2")
+_CLEANUP_START_CALLS = {
+    scope: [
         mock.call(
             name=f"Execution of '{f_name}' cleanup function",
             start_time=123,
@@ -971,36 +854,51 @@ def test_log_cleanup_step_based(mock_timestamp, scope, item_type, item_id):
             parent_item_id=item_id,
             has_stats=True,
         )
-        for f_name in ("cleanup_func1", "cleanup_func2")
+        for f_name in _CLEANUP_FUNC_NAMES
     ]
-    mock_rps.start_test_item.assert_has_calls(calls)
-    assert mock_rps.finish_test_item.call_count == 2
-
-
-@pytest.mark.parametrize(
-    "scope,item_id", [("feature", "feature_id"), ("scenario", "scenario_id")]
-)
-@mock.patch("behave_reportportal.behave_agent.timestamp")
-def test_log_cleanup_scenario_based(mock_timestamp, config, scope, item_id):
-    mock_timestamp.return_value = 123
-    mock_rps = mock.create_autospec(RPClient)
-    mock_context, mock_func1, mock_func2 = mock.Mock(), mock.Mock, mock.Mock()
-    mock_func1.__name__ = "cleanup_func1"
-    mock_func2.__name__ = "cleanup_func2"
-    mock_context._stack = [
-        {"@layer": scope, "@cleanups": [mock_func1, mock_func2]}
-    ]
-    ba = BehaveAgent(config, mock_rps)
-    ba._feature_id = "feature_id"
-    ba._scenario_id = "scenario_id"
-    ba._log_cleanups(mock_context, scope)
-    calls = [
+    for scope, item_type, item_id in (
+        ("feature", "AFTER_SUITE", "feature_id"),
+        ("scenario", "AFTER_TEST", "scenario_id"),
+    )
+}
+_CLEANUP_LOG_CALLS = {
+    scope: [
         mock.call(
             123,
             f"Execution of '{f_name}' cleanup function",
             level="INFO",
             item_id=item_id,
         )
-        for f_name in ("cleanup_func1", "cleanup_func2")
+        for f_name in _CLEANUP_FUNC_NAMES
     ]
-    mock_rps.log.assert_has_calls(calls)
+    for scope, item_id in (("feature", "feature_id"), ("scenario", "scenario_id"))
+}
+
+
+@pytest.fixture(scope="module")
+def cleanup_funcs():
+    return [SimpleNamespace(__name__=f_name) for f_name in _CLEANUP_FUNC_NAMES]
+
+
+@pytest.fixture(
+    scope="module",
+    params=[LogLayout.STEP, LogLayout.SCENARIO],
+    ids=["step", "scenario"],
+)
+def cleanup_cfg(request):
+    return Config(
+        endpoint="E", token="T", project="P", log_layout=request.param
+    )
+
+
+@pytest.mark.parametrize("scope", ["feature", "scenario"])
+def test_log_cleanup(cleanup_cfg, cleanup_funcs, scope, mock_rps, make_agent):
+    mock_context = SimpleNamespace(
+        _stack=[{"@layer": scope, "@cleanups": cleanup_funcs}]
+    )
+    make_agent(cleanup_cfg)._log_cleanups(mock_context, scope)
+    if cleanup_cfg.log_layout is LogLayout.STEP:
+        assert mock_rps.start_test_item.mock_calls == _CLEANUP_START_CALLS[scope]
+        assert mock_rps.finish_test_item.call_count == 2
+    else:
+        assert mock_rps.log.mock_calls == _CLEANUP_LOG_CALLS[scope]